@@ -0,0 +1,1164 @@
+#!/usr/bin/env python3
+"""Collects B0x price history from Base and writes price_data_bwork.json.
+
+Reads the Uniswap V4 PoolManager storage slots for the B0x/WETH and
+WETH/USDC pools, converts sqrtPriceX96 values into a USD price for B0x,
+and maintains a rolling 30-day window of one point every 30 minutes.
+The JSON output is the file the website charts load (see js/charts.js).
+
+Run it in a screen/tmux session; it backfills whatever is missing and
+then keeps collecting forever.
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import mmap
+from collections import OrderedDict
+import operator
+import os
+import random
+import signal
+import sqlite3
+import struct
+import time
+from datetime import datetime
+
+import aiohttp
+import msgspec
+import numpy as np
+from web3 import AsyncWeb3, Web3
+from web3.providers.rpc import AsyncHTTPProvider
+
+try:
+    import blosc
+except ImportError:  # optional; snapshots fall back to uncompressed columns
+    blosc = None
+
+try:
+    import numba
+except ImportError:  # optional; batch decoding falls back to plain Python
+    numba = None
+
+try:
+    import gmpy2
+except ImportError:  # optional; price conversion falls back to pure FP64
+    gmpy2 = None
+
+logger = logging.getLogger(__name__)
+
+RPC_URL = "https://mainnet.base.org"
+
+# Uniswap V4 PoolManager on Base — checksummed once so web3 never has to
+# re-validate the address per call
+POOL_MANAGER = Web3.to_checksum_address("0x498581fF718922c3f8e6A244956aF099B2652b2b")
+# keccak slots for the two pools' slot0 inside the PoolManager, as ints so
+# web3 skips the per-call hex-string parse
+BWORK_WETH_SLOT = int(
+    "0xd66bf38a86296b1a1885e2d4bdf04d74a1b988bbd7bfe2a6ae4fe5a84fd0d6da", 16
+)
+WETH_USD_SLOT = int(
+    "0xe570f62dbb4ef8d8e24d78e4a614a48e1f38dd0d76e1e0ed5a3a4ffa7e963948", 16
+)
+
+DATA_FILE = "price_data_bwork.json"
+POINTS_FILE = "price_data_bwork.points"
+SNAPSHOT_FILE = "price_data_bwork.cols"
+DAYS_BACK = 30
+POINT_INTERVAL = 30 * 60          # one point every 30 minutes
+MAX_DATA_POINTS = DAYS_BACK * 48  # 30 days x 48 points/day = 1440
+BATCH_SIZE = 25
+DB_FILE = "price_data_bwork.db"                   # batches past ~30 regress on some providers
+
+# aiohttp keeps a pooled keep-alive session under the async provider; all
+# RPC fan-out is bounded by one semaphore so we stay inside provider limits
+w3 = AsyncWeb3(AsyncHTTPProvider(RPC_URL, request_kwargs={"timeout": 15}))
+RPC_CONCURRENCY = 16
+
+
+async def init_http_session():
+    """Give the provider a pooled keep-alive session sized to our fan-out.
+
+    aiohttp's default connector allows far more connections than the rate
+    limiter will ever use; capping the pool at RPC_CONCURRENCY keeps every
+    request on a warm connection instead of paying TCP+TLS handshakes, and
+    gzip shrinks the block JSON payloads.
+    """
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=RPC_CONCURRENCY, keepalive_timeout=30
+        ),
+        headers={"Accept-Encoding": "gzip"},
+    )
+    await w3.provider.cache_async_session(session)
+_rpc_sem = asyncio.Semaphore(RPC_CONCURRENCY)
+
+# stay just under the public endpoint's advertised request rate; the
+# semaphore bounds in-flight requests, the bucket bounds request *rate*
+RPC_RATE_PER_S = 20
+
+
+class TokenBucket:
+    """Async token bucket: acquire(n) waits until n request tokens exist."""
+
+    def __init__(self, rate, burst):
+        self._rate = rate
+        self._capacity = burst
+        self._tokens = burst
+        self._stamp = time.monotonic()
+
+    async def acquire(self, n=1):
+        # requests larger than the burst drain in capacity-sized
+        # installments; a single wait for n > capacity could never finish
+        while n > 0:
+            take = min(n, self._capacity)
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._stamp) * self._rate
+                )
+                self._stamp = now
+                if self._tokens >= take:
+                    self._tokens -= take
+                    break
+                await asyncio.sleep((take - self._tokens) / self._rate)
+            n -= take
+
+
+_rpc_bucket = TokenBucket(rate=RPC_RATE_PER_S, burst=RPC_RATE_PER_S)
+
+
+def _retry_delay(attempt, error=None, cap=30.0):
+    """Seconds to wait before retry attempt N after an RPC failure.
+
+    Honors a 429 Retry-After header when the provider sent one; otherwise
+    exponential backoff with jitter so concurrent tasks don't retry in
+    lockstep.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status", None) or getattr(
+        response, "status", getattr(response, "status_code", None)
+    )
+    if status == 429:
+        headers = getattr(error, "headers", None) or getattr(response, "headers", {})
+        try:
+            return min(cap, float((headers or {}).get("Retry-After", 1)))
+        except (TypeError, ValueError):
+            pass
+    return min(cap, 2.0 ** attempt + random.random())
+
+# historical blocks and storage words are immutable, so memoize them; the
+# refinement passes and restarts-in-process would otherwise refetch them
+CACHE_MAX = 4096
+_block_cache = OrderedDict()
+_slot_cache = OrderedDict()
+
+
+def _cache_get(cache, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _cache_put(cache, key, value):
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > CACHE_MAX:
+        cache.popitem(last=False)
+
+
+_db = None
+_db_pending = 0
+DB_COMMIT_EVERY = 20  # amortize fsync across inserts
+
+
+def _get_db():
+    """Open (once) the on-disk cache; historical storage is immutable."""
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(DB_FILE)
+        # WAL: appends go to the log, so a one-row commit never rewrites
+        # the table and readers are never blocked
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS slot_cache("
+            "pool TEXT, slot TEXT, block INTEGER, value BLOB, "
+            "PRIMARY KEY(pool, slot, block))"
+        )
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS points("
+            "ts INTEGER PRIMARY KEY, block INTEGER, price REAL)"
+        )
+    return _db
+
+
+def _slot_lookup(slot, block):
+    """Cached slot word for (slot, block): memory first, then disk."""
+    word = _cache_get(_slot_cache, (slot, block))
+    if word is not None:
+        return word
+    row = _get_db().execute(
+        "SELECT value FROM slot_cache WHERE pool=? AND slot=? AND block=?",
+        (POOL_MANAGER, hex(slot), block),
+    ).fetchone()
+    if row is None:
+        return None
+    word = int.from_bytes(row[0], byteorder="big")
+    _cache_put(_slot_cache, (slot, block), word)
+    return word
+
+
+def _slot_store(slot, block, word):
+    """Remember a fetched slot word in memory and on disk."""
+    global _db_pending
+    _cache_put(_slot_cache, (slot, block), word)
+    _get_db().execute(
+        "INSERT OR IGNORE INTO slot_cache VALUES (?, ?, ?, ?)",
+        (POOL_MANAGER, hex(slot), block, word.to_bytes(32, byteorder="big")),
+    )
+    _db_pending += 1
+    if _db_pending >= DB_COMMIT_EVERY:
+        _get_db().commit()
+        _db_pending = 0
+
+
+# PoolManager exposes extsload(bytes32[]) — an on-contract multi-slot read
+# — so both pools' slot0 words arrive in ONE billable eth_call instead of
+# two eth_getStorageAt subrequests
+EXTSLOAD_SELECTOR = Web3.keccak(text="extsload(bytes32[])")[:4]
+
+
+def _encode_extsload(slots):
+    """Calldata for extsload(bytes32[]): selector + ABI-encoded slot array."""
+    return (
+        EXTSLOAD_SELECTOR
+        + (32).to_bytes(32, byteorder="big")
+        + len(slots).to_bytes(32, byteorder="big")
+        + b"".join(slot.to_bytes(32, byteorder="big") for slot in slots)
+    )
+
+
+def _decode_extsload(ret):
+    """Words from an extsload return (ABI bytes32[]: offset, length, items)."""
+    logger.debug("extsload return %s", ret)
+    n = int.from_bytes(ret[32:64], byteorder="big")
+    return [
+        int.from_bytes(ret[64 + 32 * i : 96 + 32 * i], byteorder="big")
+        for i in range(n)
+    ]
+
+
+# hex-encoded once at import; web3 would otherwise re-encode the same
+# bytes for every call
+_SLOT0_CALLDATA = "0x" + _encode_extsload([BWORK_WETH_SLOT, WETH_USD_SLOT]).hex()
+
+
+def unpack_slot0(packed):
+    """Unpack the V4 slot0 word: sqrtPriceX96, tick, protocolFee, lpFee.
+
+    One to_bytes plus four C-level slice decodes instead of four bignum
+    shift/mask passes; little-endian order puts the low 160 bits (the sqrt
+    price) in the first 20 bytes.
+    """
+    b = packed.to_bytes(32, "little")
+    sqrtPriceX96 = int.from_bytes(b[0:20], "little")
+    tick = int.from_bytes(b[20:23], "little", signed=True)
+    protocolFee = int.from_bytes(b[23:26], "little")
+    lpFee = int.from_bytes(b[26:29], "little")
+    return sqrtPriceX96, tick, protocolFee, lpFee
+
+
+INV_Q192 = 1.0 / float(1 << 192)
+
+
+if gmpy2 is not None:
+    _mpz = gmpy2.mpz
+
+    def sqrtPriceX96_to_price(sqrtPriceX96):
+        """Convert a Q64.96 sqrt price into a plain token1/token0 price.
+
+        Squares exactly in GMP and rounds to float once at the end — one
+        rounding step instead of the two the pure-FP64 path pays.
+        """
+        s = _mpz(sqrtPriceX96)
+        return float(s * s) * INV_Q192
+
+else:
+
+    def sqrtPriceX96_to_price(sqrtPriceX96):
+        """Convert a Q64.96 sqrt price into a plain token1/token0 price.
+
+        Squares in FP64 instead of exact 320-bit integers; the result only
+        ever feeds a float price, and a 53-bit mantissa keeps the relative
+        error around 1e-16 — far below what the charts display.
+        """
+        f = float(sqrtPriceX96)
+        return f * f * INV_Q192
+
+
+def words_to_u64x4(words):
+    """Stack 256-bit slot words as rows of four little-endian u64 limbs."""
+    arr = np.empty((len(words), 4), dtype=np.uint64)
+    mask = (1 << 64) - 1
+    for i, w in enumerate(words):
+        arr[i, 0] = w & mask
+        arr[i, 1] = (w >> 64) & mask
+        arr[i, 2] = (w >> 128) & mask
+        arr[i, 3] = (w >> 192) & mask
+    return arr
+
+
+def _price_kernel(u64x4, out):
+    # sqrtPriceX96 is the low 160 bits: limbs 0-1 plus the low half of limb 2
+    for i in range(u64x4.shape[0]):
+        f = (
+            float(u64x4[i, 0])
+            + float(u64x4[i, 1]) * 18446744073709551616.0  # 2**64
+            + float(u64x4[i, 2] & np.uint64(0xFFFFFFFF)) * 3.402823669209385e38  # 2**128
+        )
+        out[i] = f * f * INV_Q192
+
+
+if numba is not None:
+    _price_kernel = numba.njit(parallel=True, fastmath=True, cache=True)(
+        _price_kernel
+    )
+
+
+def slot0_prices_batch(words):
+    """Vectorized sqrtPriceX96_to_price over many packed slot0 words.
+
+    Used when re-decoding stored raw words in bulk; single-point reads keep
+    the scalar path. Compiles with Numba when it is installed.
+    """
+    u64x4 = words_to_u64x4(words)
+    out = np.empty(len(words), dtype=np.float64)
+    _price_kernel(u64x4, out)
+    return out
+
+
+def price_from_slot_words(packed, packed2):
+    """Combine both pools' slot0 words into the B0x USD price."""
+    sqrtPriceX96, tick, protocolFee, lpFee = unpack_slot0(packed)
+    price = sqrtPriceX96_to_price(sqrtPriceX96)
+
+    sqrtPriceX96_2, tick2, protocolFee2, lpFee2 = unpack_slot0(packed2)
+    price2 = sqrtPriceX96_to_price(sqrtPriceX96_2)
+
+    # WETH/USDC pool carries a 1e12 decimal offset (USDC 6 vs WETH 18)
+    actual_price = (price2 * 10 ** 12) / price
+    return actual_price
+
+
+async def getSlot0(block):
+    """Fetch both pools' slot0 at a block (one batch POST) and price B0x."""
+    word = _slot_lookup(BWORK_WETH_SLOT, block)
+    word2 = _slot_lookup(WETH_USD_SLOT, block)
+    if word is not None and word2 is not None:
+        return price_from_slot_words(word, word2)
+    block_hex = f"0x{block:x}"  # format once; retries reuse it
+    # retry the whole call: a transient failure costs one request, never a
+    # half-priced point — both slots always arrive together
+    for attempt in range(3):
+        await _rpc_bucket.acquire()
+        try:
+            ret = await w3.eth.call(
+                {"to": POOL_MANAGER, "data": _SLOT0_CALLDATA},
+                block_identifier=block_hex,
+            )
+            break
+        except Exception as e:
+            if attempt == 2:
+                raise
+            await asyncio.sleep(_retry_delay(attempt, e))
+    word, word2 = _decode_extsload(ret)
+    _slot_store(BWORK_WETH_SLOT, block, word)
+    _slot_store(WETH_USD_SLOT, block, word2)
+    return price_from_slot_words(word, word2)
+
+
+def _prices_from_word_columns(words1, words2):
+    """One vectorized pass over whole columns of slot0 words.
+
+    Both pools' sqrt prices come out of the batch decoder as float64
+    arrays, so the squaring, the 1e12 decimal offset and the division fuse
+    into two array expressions instead of per-block Python dispatch.
+    """
+    price = slot0_prices_batch(words1)
+    price2 = slot0_prices_batch(words2)
+    return (price2 * 1e12 / price).tolist()
+
+
+async def batch_get_slot0(block_numbers):
+    """Price many blocks at once: both slots for several blocks per POST."""
+    blocks_per_batch = BATCH_SIZE  # one extsload subrequest per block now
+    prices = {}
+    needed = []
+    cached_blocks, cached_w1, cached_w2 = [], [], []
+    for b in block_numbers:
+        word = _slot_lookup(BWORK_WETH_SLOT, b)
+        word2 = _slot_lookup(WETH_USD_SLOT, b)
+        if word is not None and word2 is not None:
+            cached_blocks.append(b)
+            cached_w1.append(word)
+            cached_w2.append(word2)
+        else:
+            needed.append(b)
+    if cached_blocks:
+        prices.update(zip(cached_blocks, _prices_from_word_columns(cached_w1, cached_w2)))
+
+    # bind once: web3's attribute chain costs two __getattribute__ passes
+    eth_call = w3.eth.call
+
+    async def _fetch_chunk(chunk):
+        async with _rpc_sem:
+            await _rpc_bucket.acquire(len(chunk))
+            try:
+                async with w3.batch_requests() as batch:
+                    for b in chunk:
+                        batch.add(
+                            eth_call(
+                                {"to": POOL_MANAGER, "data": _SLOT0_CALLDATA},
+                                block_identifier=f"0x{b:x}",
+                            )
+                        )
+                    results = await batch.async_execute()
+            except Exception as e:
+                logger.warning(
+                    "Batch slot0 fetch failed for blocks %d..%d: %s",
+                    chunk[0],
+                    chunk[-1],
+                    e,
+                )
+                return {}
+            words1, words2 = [], []
+            for b, ret in zip(chunk, results):
+                word, word2 = _decode_extsload(ret)
+                _slot_store(BWORK_WETH_SLOT, b, word)
+                _slot_store(WETH_USD_SLOT, b, word2)
+                words1.append(word)
+                words2.append(word2)
+            return dict(zip(chunk, _prices_from_word_columns(words1, words2)))
+
+    chunks = [
+        needed[start : start + blocks_per_batch]
+        for start in range(0, len(needed), blocks_per_batch)
+    ]
+    for chunk_prices in await asyncio.gather(*(_fetch_chunk(c) for c in chunks)):
+        prices.update(chunk_prices)
+    return prices
+
+
+_chain_head = (0, 0, 0.0)  # (block, timestamp, monotonic time of the probe)
+
+
+async def get_current_block_and_timestamp():
+    """Current head (block, timestamp); reuses a probe younger than 12s."""
+    global _chain_head
+    block, ts, probed_at = _chain_head
+    if time.monotonic() - probed_at < 12:
+        return block, ts
+    await _rpc_bucket.acquire(2)
+    current_block = await w3.eth.block_number
+    block_data = await w3.eth.get_block(current_block, full_transactions=False)
+    _chain_head = (current_block, block_data["timestamp"], time.monotonic())
+    return current_block, block_data["timestamp"]
+
+
+# (timestamp, block) pairs from every block we have ever fetched, sorted by
+# timestamp — nearby targets interpolate off these without any new RPC
+_probes = []
+
+
+def remember_probe(block, ts):
+    """Record a known (block, timestamp) pair for later interpolation."""
+    entry = (ts, block)
+    i = bisect.bisect_left(_probes, entry)
+    if i >= len(_probes) or _probes[i] != entry:
+        _probes.insert(i, entry)
+
+
+_block_rate = (2.0, -1)  # (seconds per block, current_block // 1800 at compute)
+
+
+def seconds_per_block(current_block):
+    """Observed chain block rate, recomputed at most once per ~hour.
+
+    Spans the oldest and newest probes so one odd interval cannot skew it;
+    between refreshes every caller reuses the cached ratio instead of
+    re-deriving (or re-sampling) it per target.
+    """
+    global _block_rate
+    rate, epoch = _block_rate
+    now_epoch = current_block // 1800
+    if epoch != now_epoch and len(_probes) >= 2:
+        lo_ts, lo_block = _probes[0]
+        hi_ts, hi_block = _probes[-1]
+        if hi_block > lo_block and hi_ts > lo_ts:
+            rate = (hi_ts - lo_ts) / (hi_block - lo_block)
+            _block_rate = (rate, now_epoch)
+    return rate
+
+
+def interpolate_block(target_timestamp, current_block, current_timestamp):
+    """Closed-form block estimate from the two probes nearest the target."""
+    i = bisect.bisect_left(_probes, (target_timestamp, -1))
+    lo = _probes[i - 1] if i > 0 else None
+    hi = _probes[i] if i < len(_probes) else (current_timestamp, current_block)
+    if lo is None:
+        lo, hi = hi, (current_timestamp, current_block)
+    lo_ts, lo_block = lo
+    hi_ts, hi_block = hi
+    if hi_ts == lo_ts or hi_block == lo_block:
+        # degenerate bracket: fall back to the cached chain-wide rate
+        rate = seconds_per_block(current_block)
+    else:
+        rate = (hi_ts - lo_ts) / (hi_block - lo_block)
+    estimated = lo_block + round((target_timestamp - lo_ts) / rate)
+    return max(1, min(current_block, estimated))
+
+
+async def estimate_block_from_timestamp(target_timestamp, current_block, current_timestamp):
+    """Estimate which block was mined at target_timestamp."""
+    remember_probe(current_block, current_timestamp)
+    if len(_probes) < 2:
+        # cold cache: sample a block ~24h back once to seed the probe list
+        sample_block = max(
+            1, current_block - int(24 * 3600 / seconds_per_block(current_block))
+        )
+        await _rpc_bucket.acquire()
+        sample_data = await w3.eth.get_block(sample_block)
+        remember_probe(sample_block, sample_data["timestamp"])
+    return interpolate_block(target_timestamp, current_block, current_timestamp)
+
+
+async def batch_get_blocks(block_numbers):
+    """Fetch several blocks in one JSON-RPC batch POST (chunks of BATCH_SIZE)."""
+    results = {}
+    needed = []
+    for b in block_numbers:
+        cached = _cache_get(_block_cache, b)
+        if cached is not None:
+            results[b] = cached
+        else:
+            needed.append(b)
+    get_block = w3.eth.get_block
+    for start in range(0, len(needed), BATCH_SIZE):
+        chunk = needed[start : start + BATCH_SIZE]
+        await _rpc_bucket.acquire(len(chunk))
+        async with w3.batch_requests() as batch:
+            for b in chunk:
+                batch.add(get_block(f"0x{b:x}"))
+            for block_data in await batch.async_execute():
+                _cache_put(_block_cache, block_data["number"], block_data)
+                results[block_data["number"]] = block_data
+    return results
+
+
+async def find_block_for_timestamp(
+    target_ts, current_block, current_timestamp, tolerance=300, max_probes=8
+):
+    """Bracketed secant search for the block mined closest to target_ts.
+
+    Seeds the bracket from the probe cache (so nearby targets resume from
+    each other's work), then repeatedly probes the secant estimate between
+    the bracket ends. Converges in 2-3 probes on a steady chain; every
+    probe lands in the block cache and the probe list for later searches.
+    """
+    # tightest known bracket around the target from previous probes
+    i = bisect.bisect_left(_probes, (target_ts, -1))
+    lo_ts, lo = _probes[i - 1] if i > 0 else (None, 1)
+    hi_ts, hi = _probes[i] if i < len(_probes) else (current_timestamp, current_block)
+    if lo_ts is None:
+        rate = seconds_per_block(current_block)
+        lo = max(1, hi - int((hi_ts - target_ts) / rate) * 2)
+        lo_ts = None  # fetched below
+    fetched = await batch_get_blocks([b for b in (lo, hi) if b is not None])
+    lo_data, hi_data = fetched[lo], fetched[hi]
+    lo_ts, hi_ts = lo_data["timestamp"], hi_data["timestamp"]
+    best = min((lo_data, hi_data), key=lambda bd: abs(bd["timestamp"] - target_ts))
+    for _ in range(max_probes):
+        if abs(best["timestamp"] - target_ts) <= tolerance or hi - lo <= 1:
+            break
+        if hi_ts == lo_ts:
+            break
+        mid = lo + round((target_ts - lo_ts) * (hi - lo) / (hi_ts - lo_ts))
+        mid = max(lo + 1, min(hi - 1, mid))
+        mid_data = (await batch_get_blocks([mid]))[mid]
+        mid_ts = mid_data["timestamp"]
+        remember_probe(mid, mid_ts)
+        if abs(mid_ts - target_ts) < abs(best["timestamp"] - target_ts):
+            best = mid_data
+        if mid_ts < target_ts:
+            lo, lo_ts = mid, mid_ts
+        else:
+            hi, hi_ts = mid, mid_ts
+    return best
+
+
+BRACKET_RADIUS = 2  # candidate blocks either side of a refined estimate
+
+
+def _bracket_candidates(estimated_block, delta, current_block):
+    """Candidate blocks around an estimate, spread to cover a timing miss.
+
+    The step is sized so the five candidates span the whole observed error
+    (delta seconds at ~2s/block), letting one batched fetch replace a serial
+    narrowing loop.
+    """
+    step = max(1, round(abs(delta) / seconds_per_block(current_block) / BRACKET_RADIUS))
+    return tuple(
+        max(1, min(current_block, estimated_block + k * step))
+        for k in range(-BRACKET_RADIUS, BRACKET_RADIUS + 1)
+    )
+
+
+async def resolve_target_blocks(targets, current_block, current_timestamp):
+    """Map each target timestamp to the block mined closest to it.
+
+    Estimates every target's block first, fetches all estimates in batched
+    requests, then re-probes only the targets still outside the 5-minute
+    tolerance with a bracket of candidate blocks — most land on the first
+    pass since Base block time is ~2s.
+    """
+
+    async def _estimate(t):
+        async with _rpc_sem:
+            return t, await estimate_block_from_timestamp(
+                t, current_block, current_timestamp
+            )
+
+    # pending maps target -> candidate blocks; the first pass carries a
+    # single estimate, refinement passes carry a bracket of candidates so
+    # each target needs at most one more batched round-trip
+    estimates = await asyncio.gather(
+        *(_estimate(t) for t in targets), return_exceptions=True
+    )
+    pending = {}
+    for item in estimates:
+        if isinstance(item, BaseException):
+            # one dead estimate should not sink the whole backfill pass;
+            # the target stays missing and is retried next cycle
+            logger.warning("target estimate failed: %s", item)
+            continue
+        t, est = item
+        pending[t] = (est,)
+    resolved = {}
+    ts_field = operator.itemgetter("timestamp")
+    passes = 0
+    extra_probes = 0  # probes beyond the first per target; should average ~0
+    # a bracketed refinement converges in one pass almost always, so two
+    # refinement passes are plenty
+    while pending and passes < 3:
+        want = sorted({b for candidates in pending.values() for b in candidates})
+        fetched = await batch_get_blocks(want)
+        for block_data in fetched.values():
+            remember_probe(block_data["number"], ts_field(block_data))
+        still_pending = {}
+        for target_ts, candidates in pending.items():
+            block_data = min(
+                (fetched[b] for b in candidates),
+                key=lambda bd: abs(ts_field(bd) - target_ts),
+            )
+            actual_timestamp = ts_field(block_data)
+            delta = actual_timestamp - target_ts
+            # refine only outside the 5-minute tolerance; anything closer
+            # is accepted as-is on a 30-minute grid
+            if abs(delta) > 300:
+                refined = interpolate_block(
+                    target_ts, current_block, current_timestamp
+                )
+                bracket = _bracket_candidates(refined, delta, current_block)
+                if set(bracket) - set(candidates):
+                    logger.debug(
+                        "refining target %d: probe off by %ds", target_ts, delta
+                    )
+                    still_pending[target_ts] = bracket
+                    extra_probes += 1
+                    continue
+            resolved[target_ts] = block_data
+        pending = still_pending
+        passes += 1
+    if targets:
+        logger.info(
+            "resolved %d targets, %.2f extra probes per target",
+            len(resolved) + len(pending),
+            extra_probes / len(targets),
+        )
+    if pending:
+        # stubborn targets (chain-rate discontinuities): fall back to a
+        # convergent secant search instead of settling for the last bracket
+
+        async def _search(t):
+            async with _rpc_sem:
+                return t, await find_block_for_timestamp(
+                    t, current_block, current_timestamp
+                )
+
+        for target_ts, block_data in await asyncio.gather(
+            *(_search(t) for t in pending)
+        ):
+            resolved[target_ts] = block_data
+    return resolved
+
+
+async def fetch_price_points(block_datas):
+    """Fetch prices for many blocks via batched storage reads."""
+    prices = await batch_get_slot0([b["number"] for b in block_datas])
+    points = []
+    for block_data in block_datas:
+        price = prices.get(block_data["number"])
+        if price is None:
+            logger.warning("No price for block %d; skipping point", block_data["number"])
+            continue
+        points.append((block_data, price))
+    return points
+
+
+DAY_OFFSETS = tuple(range(0, 86400, POINT_INTERVAL))
+
+
+def get_target_timestamps_for_day(timestamp):
+    """All 48 half-hour target timestamps for the UTC day containing ts.
+
+    Pure integer math: UTC midnight plus the precomputed half-hour
+    offsets — no datetime objects, no per-slot replace()/timestamp()
+    round-trips.
+    """
+    midnight = timestamp - timestamp % 86400
+    return [midnight + off for off in DAY_OFFSETS]
+
+
+def _has_point_near(sorted_ts, target_ts):
+    """True if any existing timestamp lies within half an interval of target."""
+    i = bisect.bisect_left(sorted_ts, target_ts)
+    if i < len(sorted_ts) and sorted_ts[i] - target_ts < POINT_INTERVAL / 2:
+        return True
+    if i > 0 and target_ts - sorted_ts[i - 1] < POINT_INTERVAL / 2:
+        return True
+    return False
+
+
+def get_missing_timestamps(timestamps, current_timestamp):
+    """Which half-hour targets in the last DAYS_BACK days have no point yet."""
+    sorted_ts = sorted(timestamps)
+    missing = []
+    # every day's grid is the same 48 slots shifted by whole days, so build
+    # today's once and derive the rest by subtraction
+    today_targets = get_target_timestamps_for_day(current_timestamp)
+    for days_back in range(DAYS_BACK):
+        day_offset = days_back * 86400
+        for today_ts in today_targets:
+            target_ts = today_ts - day_offset
+            if target_ts > current_timestamp:
+                continue
+            if not _has_point_near(sorted_ts, target_ts):
+                missing.append(target_ts)
+    missing.sort()
+    return missing
+
+
+def is_target_time(timestamp, tolerance_minutes=5):
+    """True if timestamp lands on (or near) a 30-minute boundary.
+
+    Pure integer arithmetic: the grid repeats every 30 minutes, so the
+    distance to the nearest boundary is a single modulo over whole
+    minutes (seconds truncate, as before) — no datetime allocation, no
+    per-slot loop.
+    """
+    offset = (timestamp // 60) % 30
+    return min(offset, 30 - offset) <= tolerance_minutes
+
+
+class Point(msgspec.Struct):
+    ts: int
+    block: int
+    price: float
+
+
+POINT_DTYPE = np.dtype([("ts", "<i8"), ("block", "<i8"), ("price", "<f8")])
+
+
+class PointRing:
+    """Fixed-capacity ring of (ts, block, price) rows, kept in ts order.
+
+    One contiguous 24-byte-per-row structured array instead of three deques
+    of boxed Python objects; columns come out as NumPy views, which is what
+    the snapshot writer and the chart export both want.
+    """
+
+    def __init__(self, capacity=MAX_DATA_POINTS):
+        self._buf = np.empty(capacity, dtype=POINT_DTYPE)
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _compact(self):
+        # rotate so the live rows occupy buf[0:count]
+        if self._start:
+            self._buf = np.roll(self._buf, -self._start)
+            self._start = 0
+
+    def rows(self):
+        """The live rows in timestamp order (zero-copy while unwrapped)."""
+        end = self._start + self._count
+        cap = len(self._buf)
+        if end <= cap:
+            return self._buf[self._start : end]
+        return np.concatenate((self._buf[self._start :], self._buf[: end - cap]))
+
+    def ts(self):
+        return self.rows()["ts"]
+
+    def last_ts(self):
+        if not self._count:
+            return 0
+        idx = (self._start + self._count - 1) % len(self._buf)
+        return int(self._buf[idx]["ts"])
+
+    def append(self, ts, block, price):
+        cap = len(self._buf)
+        idx = (self._start + self._count) % cap
+        self._buf[idx] = (ts, block, price)
+        if self._count == cap:
+            self._start = (self._start + 1) % cap  # overwrote the oldest row
+        else:
+            self._count += 1
+
+    def appendleft(self, ts, block, price):
+        if self._count == len(self._buf):
+            # full ring: a point that belongs inside the window displaces
+            # the oldest row (callers resort() after hole fills); only
+            # points older than everything held are outside the window
+            oldest = int(self._buf["ts"].argmin())
+            if ts <= self._buf["ts"][oldest]:
+                return
+            self._buf[oldest] = (ts, block, price)
+            return
+        self._start = (self._start - 1) % len(self._buf)
+        self._buf[self._start] = (ts, block, price)
+        self._count += 1
+
+    def popleft(self):
+        self._start = (self._start + 1) % len(self._buf)
+        self._count -= 1
+
+    def insert(self, pos, ts, block, price):
+        if self._count == len(self._buf):
+            self.popleft()
+            pos = max(0, pos - 1)
+        self._compact()
+        self._buf[pos + 1 : self._count + 1] = self._buf[pos : self._count]
+        self._buf[pos] = (ts, block, price)
+        self._count += 1
+
+    def resort(self):
+        self._compact()
+        self._buf[: self._count].sort(order="ts")
+
+
+_point_decoder = msgspec.msgpack.Decoder(type=Point)
+_points_inserted = 0
+
+
+_export_dirty = False
+
+
+def append_point(ts, block, price):
+    """Record one point durably — a single WAL append, no rewrite."""
+    global _points_inserted, _export_dirty
+    db = _get_db()
+    db.execute(
+        "INSERT OR REPLACE INTO points VALUES (?, ?, ?)", (ts, block, price)
+    )
+    db.commit()
+    _points_inserted += 1
+    _export_dirty = True
+
+
+def _load_snapshot():
+    """Read the legacy columnar snapshot (migration only)."""
+    with open(SNAPSHOT_FILE, "rb") as f:
+        payload = msgspec.msgpack.decode(f.read())
+
+    def column(name, dtype):
+        raw = payload["columns"][name]
+        if payload["codec"] == "blosc-zstd":
+            raw = blosc.decompress(raw)
+        return np.frombuffer(raw, dtype=dtype)
+
+    return (
+        column("ts", np.int64).tolist(),
+        column("block", np.int64).tolist(),
+        column("price", np.float64).tolist(),
+    )
+
+
+def compact_points(points):
+    """Trim rows past the rolling window and fold the WAL back in."""
+    global _points_inserted
+    db = _get_db()
+    db.execute(
+        "DELETE FROM points WHERE ts NOT IN "
+        "(SELECT ts FROM points ORDER BY ts DESC LIMIT ?)",
+        (MAX_DATA_POINTS,),
+    )
+    db.commit()
+    db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    _points_inserted = 0
+
+
+def _replay_journal(timestamps, blocks, prices):
+    """Append points from the legacy msgpack journal (migration only)."""
+    with open(POINTS_FILE, "rb") as f:
+        view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        off = 0
+        while off + 4 <= len(view):
+            (length,) = struct.unpack(">I", view[off : off + 4])
+            off += 4
+            if off + length > len(view):
+                break  # truncated trailing frame from a crash mid-append
+            p = _point_decoder.decode(view[off : off + length])
+            off += length
+            timestamps.append(p.ts)
+            blocks.append(p.block)
+            prices.append(p.price)
+        view.close()
+
+
+def _ring_from_columns(timestamps, blocks, prices):
+    """Build a sorted ring from parallel columns, keeping the newest rows."""
+    ring = PointRing()
+    combined = sorted(zip(timestamps, blocks, prices))
+    for ts, block, price in combined[-MAX_DATA_POINTS:]:
+        ring.append(int(ts), int(block), float(price))
+    return ring
+
+
+def _import_legacy_points(ring):
+    """Copy migrated rows into the database so old files stop mattering."""
+    db = _get_db()
+    rows = ring.rows()
+    db.executemany(
+        "INSERT OR REPLACE INTO points VALUES (?, ?, ?)",
+        zip(rows["ts"].tolist(), rows["block"].tolist(), rows["price"].tolist()),
+    )
+    db.commit()
+
+
+def load_data():
+    """Load the point ring from disk, or start fresh if there is none yet."""
+    rows = (
+        _get_db()
+        .execute(
+            "SELECT ts, block, price FROM points ORDER BY ts DESC LIMIT ?",
+            (MAX_DATA_POINTS,),
+        )
+        .fetchall()
+    )
+    if rows:
+        ring = PointRing()
+        for ts, block, price in reversed(rows):
+            ring.append(int(ts), int(block), float(price))
+        return ring
+    # one-time migration from the legacy snapshot+journal files
+    if os.path.exists(SNAPSHOT_FILE) or os.path.exists(POINTS_FILE):
+        timestamps, blocks, prices = [], [], []
+        try:
+            if os.path.exists(SNAPSHOT_FILE):
+                timestamps, blocks, prices = _load_snapshot()
+            if os.path.exists(POINTS_FILE) and os.path.getsize(POINTS_FILE):
+                _replay_journal(timestamps, blocks, prices)
+            ring = _ring_from_columns(timestamps, blocks, prices)
+            _import_legacy_points(ring)
+            return ring
+        except Exception as e:
+            logger.warning("Failed to load point store: %s", e)
+    # one-time migration from the legacy full-rewrite JSON checkpoint
+    if os.path.exists(DATA_FILE):
+        try:
+            with open(DATA_FILE, "r") as f:
+                data = json.load(f)
+            ring = _ring_from_columns(
+                data.get("timestamps", []),
+                data.get("blocks", []),
+                data.get("prices", []),
+            )
+            _import_legacy_points(ring)
+            return ring
+        except Exception as e:
+            logger.warning("Failed to load %s: %s", DATA_FILE, e)
+    return PointRing()
+
+
+def save_data(points, force=False):
+    """Export the ring as the JSON js/charts.js expects (site snapshot).
+
+    No-op unless a point landed since the last export, so callers can
+    invoke it freely and at most one file rewrite happens per cycle.
+    """
+    global _export_dirty
+    if not _export_dirty and not force:
+        return
+    rows = points.rows()
+    data = {
+        "timestamps": rows["ts"].tolist(),
+        "blocks": rows["block"].tolist(),
+        "prices": rows["price"].tolist(),
+        "last_updated": int(time.time()),
+    }
+    # write-then-rename so a crash mid-dump can't truncate the served file
+    with open(DATA_FILE + ".tmp", "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(DATA_FILE + ".tmp", DATA_FILE)
+    _export_dirty = False
+
+
+def add_data_point(points, new_timestamp, new_block, new_price):
+    """Insert a point keeping timestamps sorted; evict oldest past the cap."""
+    # binary search on the sorted ts column; the old linear scan shifted
+    # through the whole window for every out-of-order insert
+    insert_pos = int(np.searchsorted(points.ts(), new_timestamp, side="right"))
+    if insert_pos == len(points):
+        points.append(new_timestamp, new_block, new_price)
+    else:
+        points.insert(insert_pos, new_timestamp, new_block, new_price)
+    append_point(new_timestamp, new_block, new_price)
+
+
+async def collect_historical_data(points, current_block, current_timestamp):
+    """Full backfill: walk every half-hour target in the window, oldest last."""
+    missing = get_missing_timestamps(points.ts(), current_timestamp)
+    logger.info("Backfilling %d historical points...", len(missing))
+    resolved = await resolve_target_blocks(missing, current_block, current_timestamp)
+    # targets whose estimate failed are absent from resolved; skip them
+    # here and let the next cycle retry
+    fetched = await fetch_price_points(
+        [resolved[t] for t in reversed(missing) if t in resolved]
+    )
+    for i, (block_data, price) in enumerate(fetched):
+        actual_timestamp = block_data["timestamp"]
+        points.appendleft(actual_timestamp, block_data["number"], price)
+        append_point(actual_timestamp, block_data["number"], price)
+        logger.debug(
+            "Collected %d/%d: Block %d ts %d Price %s",
+            i + 1,
+            len(fetched),
+            block_data["number"],
+            actual_timestamp,
+            price,
+        )
+    save_data(points)
+
+
+async def collect_missing_historical_data(points, current_block, current_timestamp):
+    """Catch-up backfill: fill only the holes found in the stored window."""
+    missing = get_missing_timestamps(points.ts(), current_timestamp)
+    if not missing:
+        return
+    logger.info("Filling %d missing points...", len(missing))
+    resolved = await resolve_target_blocks(missing, current_block, current_timestamp)
+    # targets whose estimate failed are absent from resolved; skip them
+    # here and let the next cycle retry
+    fetched = await fetch_price_points(
+        [resolved[t] for t in reversed(missing) if t in resolved]
+    )
+    for i, (block_data, price) in enumerate(fetched):
+        actual_timestamp = block_data["timestamp"]
+        points.appendleft(actual_timestamp, block_data["number"], price)
+        append_point(actual_timestamp, block_data["number"], price)
+        logger.debug(
+            "Filled %d/%d: Block %d ts %d Price %s",
+            i + 1,
+            len(fetched),
+            block_data["number"],
+            actual_timestamp,
+            price,
+        )
+    # re-sort since holes are filled newest-first
+    points.resort()
+    save_data(points)
+
+
+async def main():
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s"
+    )
+    await init_http_session()
+    # systemd/docker stop sends SIGTERM; funnel it into the same
+    # KeyboardInterrupt flush path Ctrl-C takes
+    asyncio.get_running_loop().add_signal_handler(
+        signal.SIGTERM, signal.raise_signal, signal.SIGINT
+    )
+    points = load_data()
+    logger.info("Loaded %d existing data points", len(points))
+    compact_points(points)
+
+    current_block, current_timestamp = await get_current_block_and_timestamp()
+
+    if not len(points):
+        # fresh start: backfill the whole window
+        await collect_historical_data(points, current_block, current_timestamp)
+    elif current_timestamp - points.last_ts() > POINT_INTERVAL:
+        # we were down for a while: catch up from the last saved point
+        await collect_missing_historical_data(
+            points, current_block, current_timestamp
+        )
+        save_data(points)
+
+    logger.info("Starting monitor loop (one point every 30 minutes)...")
+    consecutive_failures = 0
+    try:
+        while True:
+            try:
+                current_block, current_timestamp = await get_current_block_and_timestamp()
+                if current_timestamp - points.last_ts() >= POINT_INTERVAL:
+                    price = await getSlot0(current_block)
+                    add_data_point(points, current_timestamp, current_block, price)
+                    logger.info(
+                        "Added point: Block %d Time %s Price %s",
+                        current_block,
+                        datetime.fromtimestamp(current_timestamp),
+                        price,
+                    )
+                    await collect_missing_historical_data(
+                        points, current_block, current_timestamp
+                    )
+                    save_data(points)
+                    if _points_inserted > MAX_DATA_POINTS:
+                        compact_points(points)
+                consecutive_failures = 0
+            except Exception as e:
+                # back off harder the longer the outage lasts; a 429 with
+                # Retry-After is respected instead of the blanket 5 minutes
+                consecutive_failures += 1
+                delay = _retry_delay(consecutive_failures, e, cap=300.0)
+                logger.error(
+                    "Monitor loop error (failure %d, retrying in %.0fs): %s",
+                    consecutive_failures,
+                    delay,
+                    e,
+                )
+                await asyncio.sleep(delay)
+                continue
+            # wake when the next point is actually due, not on a fixed cadence
+            next_due = (points.last_ts() or time.time()) + POINT_INTERVAL
+            await asyncio.sleep(max(5, next_due - time.time()))
+    finally:
+        # under asyncio.run, Ctrl-C/SIGTERM surfaces here as CancelledError
+        # (the runner cancels the main task), never as KeyboardInterrupt
+        # inside the coroutine — only finally reliably runs on the way out
+        logger.info("Shutting down; flushing data...")
+        save_data(points, force=True)
+        compact_points(points)
+        _get_db().commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())